@@ -0,0 +1,119 @@
+# app/assets.py
+import os, gzip, hashlib, json, mimetypes
+from typing import Dict, List
+from jinja2 import FileSystemBytecodeCache
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip variants are always built
+    brotli = None
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+BUILD_DIR = os.environ.get("ASSET_BUILD_DIR", os.path.join(BASE_DIR, "build"))
+STATIC_PREFIX = "/static/"
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".html"}
+
+# logical name ("style.css") -> fingerprinted name ("style.1a2b3c4d5e6f.css"), filled by build_static()
+manifest: Dict[str, str] = {}
+_fingerprinted = set()
+
+def static_url(name: str) -> str:
+    # falls back to the plain path when assets were not built (e.g. app1.py)
+    return STATIC_PREFIX + manifest.get(name, name)
+
+def _write_atomic(path: str, data: bytes):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def build_static(static_dir: str = STATIC_DIR) -> Dict[str, str]:
+    out_dir = os.path.join(BUILD_DIR, "static")
+    built = {}
+    for root, _, files in os.walk(static_dir):
+        for fn in files:
+            src = os.path.join(root, fn)
+            rel = os.path.relpath(src, static_dir).replace(os.sep, "/")
+            with open(src, "rb") as f:
+                data = f.read()
+            stem, ext = os.path.splitext(rel)
+            hashed = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+            dst = os.path.join(out_dir, hashed)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            if not os.path.exists(dst):
+                _write_atomic(dst, data)
+            if ext in COMPRESSIBLE:
+                if not os.path.exists(dst + ".gz"):
+                    _write_atomic(dst + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+                if brotli and not os.path.exists(dst + ".br"):
+                    _write_atomic(dst + ".br", brotli.compress(data, quality=11))
+            built[rel] = hashed
+    os.makedirs(out_dir, exist_ok=True)
+    _write_atomic(os.path.join(out_dir, "manifest.json"), json.dumps(built, indent=2).encode())
+    manifest.clear(); manifest.update(built)
+    _fingerprinted.clear(); _fingerprinted.update(built.values())
+    return built
+
+def precompile_templates(templates) -> List[str]:
+    # compile every template once at startup and persist the bytecode so later workers skip the parse
+    cache_dir = os.path.join(BUILD_DIR, "jinja")
+    os.makedirs(cache_dir, exist_ok=True)
+    env = templates.env
+    env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    names = env.list_templates()
+    for name in names:
+        env.get_template(name)
+    return names
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    # "br;q=1.0, gzip;q=0.5, *;q=0" -> {"br": 1.0, "gzip": 0.5, "*": 0.0}
+    accepted = {}
+    for item in header.split(","):
+        coding, *params = [p.strip() for p in item.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.lower()] = q
+    return accepted
+
+class PrecompressedStaticMiddleware:
+    """Serves fingerprinted static files (and their .br/.gz variants) with immutable cache headers."""
+
+    def __init__(self, app, directory: str = None):
+        self.app = app
+        self.directory = directory or os.path.join(BUILD_DIR, "static")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(STATIC_PREFIX):
+            name = scope["path"][len(STATIC_PREFIX):]
+            if name in _fingerprinted:
+                accept = Headers(scope=scope).get("accept-encoding", "")
+                response = self._response(name, accept)
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+    def _response(self, name: str, accept: str) -> FileResponse:
+        path = os.path.join(self.directory, name)
+        media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        headers = {"Cache-Control": IMMUTABLE_CACHE, "Vary": "Accept-Encoding"}
+        accepted = accepted_encodings(accept)
+        wildcard = accepted.get("*", 0.0)
+        variants = [(accepted.get(encoding, wildcard), encoding, suffix) for encoding, suffix in (("br", ".br"), ("gzip", ".gz"))]
+        # highest q wins, br on ties; q=0 means "not acceptable"
+        for q, encoding, suffix in sorted(variants, key=lambda v: -v[0]):
+            if q > 0 and os.path.exists(path + suffix):
+                headers["Content-Encoding"] = encoding
+                return FileResponse(path + suffix, media_type=media_type, headers=headers)
+        return FileResponse(path, media_type=media_type, headers=headers)
@@ -1,37 +1,75 @@
-import os, logging
+import os, json, time, logging
 from fastapi import APIRouter, Request, HTTPException
 from fastapi.responses import RedirectResponse
-from authlib.integrations.starlette_client import OAuth
 from sqlmodel import Session, select
-from app.db import engine, get_session
+from app.db import BASE_DIR, engine, get_session
 from app.models.user import User
-from app.models.invite import Invite
-from app.models.group import GroupMember
+from app.services.membership_service import redeem_invites
 
 router = APIRouter()
-oauth = OAuth()
-oauth.register(
-    name='google',
-    client_id=os.environ.get("GOOGLE_CLIENT_ID"),
-    client_secret=os.environ.get("GOOGLE_CLIENT_SECRET"),
-    server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
-    client_kwargs={'scope': 'openid email profile'},
-)
-logging.basicConfig(level=logging.DEBUG)
+log = logging.getLogger(__name__)
+
+DISCOVERY_URL = 'https://accounts.google.com/.well-known/openid-configuration'
+DISCOVERY_CACHE = os.environ.get("OIDC_DISCOVERY_CACHE", os.path.join(BASE_DIR, "build", "google-openid-configuration.json"))
+DISCOVERY_TTL = int(os.environ.get("OIDC_DISCOVERY_TTL", "86400"))
+_oauth = None
+
+def _read_discovery_cache():
+    try:
+        if time.time() - os.path.getmtime(DISCOVERY_CACHE) > DISCOVERY_TTL:
+            return None
+        with open(DISCOVERY_CACHE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_discovery_cache(metadata: dict):
+    doc = {k: v for k, v in metadata.items() if k not in ("jwks", "_loaded_at")}  # keys rotate; always fetched live
+    try:
+        os.makedirs(os.path.dirname(DISCOVERY_CACHE), exist_ok=True)
+        tmp = f"{DISCOVERY_CACHE}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(doc, f)
+        os.replace(tmp, DISCOVERY_CACHE)
+    except OSError:
+        log.warning("could not write OpenID discovery cache %s", DISCOVERY_CACHE)
+
+async def google():
+    """The Google OAuth client, built on first login rather than at import; discovery comes from a local cache when fresh."""
+    global _oauth
+    if _oauth is None:
+        from authlib.integrations.starlette_client import OAuth
+        oauth = OAuth()
+        oauth.register(
+            name='google',
+            client_id=os.environ.get("GOOGLE_CLIENT_ID"),
+            client_secret=os.environ.get("GOOGLE_CLIENT_SECRET"),
+            server_metadata_url=DISCOVERY_URL,
+            client_kwargs={'scope': 'openid email profile'},
+        )
+        cached = _read_discovery_cache()
+        if cached:
+            # authlib skips the discovery fetch once _loaded_at is present
+            oauth.google.server_metadata.update(cached, _loaded_at=time.time())
+        else:
+            _write_discovery_cache(await oauth.google.load_server_metadata())
+        _oauth = oauth
+    return _oauth.google
 
 @router.get("/login")
 async def login(request: Request):
     redirect_uri = request.url_for('auth_callback')
-    return await oauth.google.authorize_redirect(request, str(redirect_uri))
+    return await (await google()).authorize_redirect(request, str(redirect_uri))
 
 @router.get("/auth", name="auth_callback")
 async def auth(request: Request):
-    logging.debug("Starting /auth callback")
+    log.debug("Starting /auth callback")
+    client = await google()
     try:
-        token = await oauth.google.authorize_access_token(request)
-        logging.debug("OAuth token response: %s", token)
+        token = await client.authorize_access_token(request)
+        log.debug("OAuth token response: %s", token)
     except Exception as e:
-        logging.exception("authorize_access_token() failed: %s", e)
+        log.exception("authorize_access_token() failed: %s", e)
         raise HTTPException(status_code=500, detail="OAuth token exchange failed; check server logs")
 
     # determine userinfo (same robust logic you had)
@@ -41,21 +79,21 @@ async def auth(request: Request):
             userinfo = token.get("userinfo")
         elif token and "id_token" in token:
             try:
-                userinfo = await oauth.google.parse_id_token(request, token)
+                userinfo = await client.parse_id_token(request, token)
             except KeyError:
-                resp = await oauth.google.get("userinfo", token=token)
+                resp = await client.get("userinfo", token=token)
                 userinfo = resp.json()
             except Exception:
-                resp = await oauth.google.get("userinfo", token=token)
+                resp = await client.get("userinfo", token=token)
                 userinfo = resp.json()
         else:
-            resp = await oauth.google.get("userinfo", token=token)
+            resp = await client.get("userinfo", token=token)
             try:
                 userinfo = resp.json()
             except:
                 userinfo = await resp.json()
     except Exception as e:
-        logging.exception("OAuth2 callback parsing failed. token=%s error=%s", token, e)
+        log.exception("OAuth2 callback parsing failed. token=%s error=%s", token, e)
         raise HTTPException(status_code=500, detail="Authentication failed; check server logs")
 
     if not userinfo or not isinstance(userinfo, dict):
@@ -85,12 +123,7 @@ async def auth(request: Request):
             if changed:
                 s.add(user); s.commit()
         if user.email:
-            invites = s.exec(select(Invite).where(Invite.email == user.email)).all()
-            for inv in invites:
-                exists = s.exec(select(GroupMember).where(GroupMember.group_id==inv.group_id, GroupMember.user_id==user.id)).first()
-                if not exists:
-                    s.add(GroupMember(group_id=inv.group_id, user_id=user.id))
-                s.delete(inv)
+            redeem_invites(s, user.id, user.email)
             s.commit()
         request.session['user'] = {"id": user.id, "name": user.name, "email": user.email}
     return RedirectResponse(url="/")
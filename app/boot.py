@@ -0,0 +1,22 @@
+# app/boot.py
+import time, logging
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__)
+
+# per-phase boot durations in ms, reported once startup finishes and at /metrics/startup
+timings = {}
+
+def record(name: str, started: float):
+    timings[name] = round((time.perf_counter() - started) * 1000, 1)
+
+@contextmanager
+def phase(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, started)
+
+def report():
+    log.info("startup timings (ms): %s", ", ".join(f"{k}={v}" for k, v in timings.items()))
@@ -1,13 +1,51 @@
-import os
+import os, hashlib
+from sqlalchemy import text
 from sqlmodel import SQLModel, create_engine, Session
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 DB_FILE = os.path.join(BASE_DIR, "db.sqlite")
 engine = create_engine(f"sqlite:///{DB_FILE}", echo=False, connect_args={"check_same_thread": False})
 
-def init_db():
+def init_db(force: bool = False) -> bool:
+    """Brings the schema up to date unless PRAGMA user_version already matches the models; returns True if it ran."""
     # Import models so SQLModel.metadata includes them
-    import app.models.user, app.models.group, app.models.expense, app.models.invite
-    SQLModel.metadata.create_all(engine)
+    import app.models.user, app.models.group, app.models.expense, app.models.invite, app.models.outbox, app.models.sync, app.models.rollup
+    return ensure_schema(engine, SQLModel.metadata, migrate=_migrate, force=force or os.environ.get("FORCE_SCHEMA_SYNC") == "1")
+
+def schema_fingerprint(metadata) -> int:
+    parts = []
+    for table in metadata.sorted_tables:
+        cols = [(c.name, str(c.type), c.nullable, c.primary_key) for c in table.columns]
+        parts.append(repr((table.name, cols, sorted(i.name for i in table.indexes))))
+    # user_version is a signed 32-bit int
+    return int(hashlib.sha256("\n".join(parts).encode()).hexdigest()[:7], 16)
+
+def ensure_schema(bind, metadata, migrate=None, force: bool = False) -> bool:
+    version = schema_fingerprint(metadata)
+    with bind.connect() as conn:
+        if not force and conn.execute(text("PRAGMA user_version")).scalar() == version:
+            return False
+    metadata.create_all(bind)
+    if migrate:
+        migrate(bind, metadata)
+    with bind.begin() as conn:
+        conn.execute(text(f"PRAGMA user_version = {version}"))
+    return True
+
+def _migrate(bind, metadata):
+    migrate_group_member_unique(bind)
+    create_missing_indexes(bind, metadata)
+
+def migrate_group_member_unique(bind=engine):
+    # drop duplicate memberships so the unique (group_id, user_id) index can be built on old databases
+    with bind.begin() as conn:
+        conn.execute(text("DELETE FROM groupmember WHERE id NOT IN (SELECT MIN(id) FROM groupmember GROUP BY group_id, user_id)"))
+
+def create_missing_indexes(bind=engine, metadata=SQLModel.metadata):
+    # create_all does not add indexes to tables that already exist
+    with bind.begin() as conn:
+        for table in metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
 
 def get_session():
     return Session(engine)
@@ -0,0 +1,157 @@
+# app/logging_setup.py
+import os, re, sys, json, uuid, queue, random, logging, zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+SECRET_KEYS = {"access_token", "refresh_token", "id_token", "client_secret", "password", "secret", "authorization", "cookie", "token", "code"}
+SECRET_PATTERN = re.compile(r"""(?i)(["']?(?:access_token|refresh_token|id_token|client_secret|password|authorization)["']?\s*[:=]\s*["']?)(?:Bearer\s+)?[^"',\s}&]+""")
+BEARER_PATTERN = re.compile(r"(?i)\bBearer\s+[A-Za-z0-9._~+/=-]+")
+REDACTED = "[REDACTED]"
+# servers that install their own synchronous stream handlers; their records are re-routed through the queue
+ADOPTED_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+_STD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+_listener = None
+dropped = 0
+
+def redact(obj):
+    if isinstance(obj, dict):
+        return {k: (REDACTED if str(k).lower() in SECRET_KEYS else redact(v)) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(redact(v) for v in obj)
+    if isinstance(obj, str):
+        return BEARER_PATTERN.sub("Bearer " + REDACTED, SECRET_PATTERN.sub(r"\1" + REDACTED, obj))
+    return obj
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; runs on the listener thread, so redaction and formatting stay off the request path."""
+
+    def format(self, record):
+        args = record.args
+        if isinstance(args, dict):
+            args = redact(args)
+        elif args:
+            args = tuple(redact(a) for a in args)
+        try:
+            message = record.msg % args if args else str(record.msg)
+        except (TypeError, ValueError):
+            message = f"{record.msg} {args!r}"
+        doc = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname, "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"), "msg": redact(message),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STD_ATTRS and not key.startswith("_"):
+                doc[key] = REDACTED if key.lower() in SECRET_KEYS else redact(value)
+        if record.exc_info:
+            doc["exc"] = redact(self.formatException(record.exc_info))
+        return json.dumps(doc, default=str)
+
+class RequestContextFilter(logging.Filter):
+    """Tags records with the current request id and samples DEBUG records; runs on the emitting thread, so it stays cheap."""
+
+    def __init__(self, debug_sample_rate: float = 1.0):
+        super().__init__()
+        self.debug_sample_rate = debug_sample_rate
+
+    def filter(self, record):
+        rid = request_id_var.get()
+        record.request_id = rid
+        if record.levelno <= logging.DEBUG and self.debug_sample_rate < 1.0:
+            # sample per request so a kept request keeps all of its debug lines
+            bucket = zlib.crc32(rid.encode()) if rid != "-" else random.getrandbits(32)
+            return (bucket % 10000) < self.debug_sample_rate * 10000
+        return True
+
+class NonBlockingQueueHandler(QueueHandler):
+    def prepare(self, record):
+        # the stdlib version formats the message here, on the caller's thread; leave that to the listener
+        return record
+
+    def enqueue(self, record):
+        global dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped += 1  # never block a request on logging
+
+def parse_levels(spec: str) -> dict:
+    # "app.auth=DEBUG,sqlalchemy.engine=WARNING"
+    levels = {}
+    for item in (spec or "").split(","):
+        name, _, level = item.strip().partition("=")
+        if name and level:
+            levels[name] = level.strip().upper()
+    return levels
+
+def setup_logging(level: str = None, levels: dict = None, debug_sample_rate: float = None, queue_size: int = None, stream=None):
+    """Routes all logging through a bounded queue to a background JSON writer. Safe to call more than once.
+
+    Call it after the server has configured its own loggers (i.e. from startup) so ADOPTED_LOGGERS can be taken over.
+    """
+    global _listener
+    level = level or os.environ.get("LOG_LEVEL", "INFO")
+    levels = levels if levels is not None else parse_levels(os.environ.get("LOG_LEVELS", ""))
+    rate = debug_sample_rate if debug_sample_rate is not None else float(os.environ.get("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+    size = queue_size or int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+    stop_logging()
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter())
+    log_queue = queue.Queue(maxsize=size)
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(RequestContextFilter(rate))
+
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+    for name in ADOPTED_LOGGERS:
+        adopted = logging.getLogger(name)
+        for h in list(adopted.handlers):
+            adopted.removeHandler(h)
+        adopted.propagate = True
+    for name, lvl in levels.items():
+        logging.getLogger(name).setLevel(lvl)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def stop_logging():
+    # flushes whatever is still queued; later records fall back to logging.lastResort
+    global _listener
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        if isinstance(h, NonBlockingQueueHandler):
+            root.removeHandler(h)
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+class RequestIdMiddleware:
+    """Binds X-Request-ID (or a fresh id) to the logging context and echoes it on the response."""
+
+    def __init__(self, app, header: str = "x-request-id"):
+        self.app = app
+        self.header = header.encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        rid = next((v.decode("latin-1") for k, v in scope["headers"] if k == self.header), None) or uuid.uuid4().hex
+        token = request_id_var.set(rid[:64])
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(self.header, rid[:64].encode("latin-1"))]
+            await send(message)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
@@ -1,16 +1,29 @@
-import os
+import os, time
+_import_started = time.perf_counter()
 from dotenv import load_dotenv
 load_dotenv()
 
+from .logging_setup import setup_logging, stop_logging, RequestIdMiddleware
+
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from starlette.middleware.sessions import SessionMiddleware
+from starlette.middleware.gzip import GZipMiddleware
 
-from .db import init_db
+from .db import init_db, engine
+from sqlmodel import Session
+from .assets import build_static, precompile_templates, static_url, PrecompressedStaticMiddleware
 from .auth import router as auth_router
 from .routes.group import router as group_router
 from .routes.expense import router as expense_router
+from .routes.sync import router as sync_router
+from .routes.analytics import router as analytics_router
+from .services.compute_pool import pool_metrics, shutdown_pool
+from .services.email_outbox import start_dispatcher, stop_dispatcher
+from .services.rollup_service import backfill_if_empty
+from .boot import phase, record, report, timings
+record("imports", _import_started)
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 
@@ -18,18 +31,57 @@ app = FastAPI(title="Expense Splitter")
 
 # templates & static 
 templates = Jinja2Templates(directory=os.path.join(BASE_DIR, "templates"))
+templates.env.globals["static_url"] = static_url
 app.templates = templates
 app.mount("/static", StaticFiles(directory=os.path.join(BASE_DIR, "static")), name="static")
 
+# fingerprinted static files are served precompressed; dynamic responses are gzipped above the threshold
+app.add_middleware(GZipMiddleware, minimum_size=int(os.environ.get("GZIP_MIN_SIZE", "1024")))
+app.add_middleware(PrecompressedStaticMiddleware)
+
 # Session middleware
 app.add_middleware(SessionMiddleware, secret_key=os.environ.get("SECRET_KEY", "change-me"))
 
+# outermost, so every log line emitted while handling a request carries its id
+app.add_middleware(RequestIdMiddleware)
+
 # include routers
 app.include_router(auth_router)
 app.include_router(group_router)
 app.include_router(expense_router)
+app.include_router(sync_router)
+app.include_router(analytics_router)
 
 
 @app.on_event("startup")
-def on_startup():
-    init_db()
+async def on_startup():
+    # paired with stop_logging() in on_shutdown, so a restarted app (or a second TestClient) logs again
+    setup_logging()
+    with phase("schema"):
+        if init_db():
+            with Session(engine) as s:
+                backfill_if_empty(s)
+    with phase("static"):
+        build_static()
+    with phase("templates"):
+        precompile_templates(templates)
+    with phase("outbox"):
+        start_dispatcher(engine)
+    report()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await stop_dispatcher()
+    shutdown_pool()
+    stop_logging()
+
+
+@app.get("/metrics/compute-pool")
+def compute_pool_metrics():
+    return pool_metrics()
+
+
+@app.get("/metrics/startup")
+def startup_metrics():
+    return timings
@@ -2,3 +2,6 @@ from .user import User
 from .group import Group, GroupMember
 from .expense import Expense, ExpenseShare
 from .invite import Invite
+from .outbox import EmailOutbox
+from .sync import GroupChange, SyncCursor, GroupSyncState
+from .rollup import SpendRollup
@@ -4,7 +4,7 @@ from sqlmodel import Field, SQLModel
 
 class Expense(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    group_id: int = Field(foreign_key="group.id")
+    group_id: int = Field(foreign_key="group.id", index=True)
     payer_id: int = Field(foreign_key="user.id")
     amount: float
     description: Optional[str] = ""
@@ -12,6 +12,6 @@ class Expense(SQLModel, table=True):
 
 class ExpenseShare(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    expense_id: int = Field(foreign_key="expense.id")
+    expense_id: int = Field(foreign_key="expense.id", index=True)
     user_id: int = Field(foreign_key="user.id")
     share: Optional[float] = None
@@ -1,4 +1,5 @@
 from typing import Optional
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 class Group(SQLModel, table=True):
@@ -6,6 +7,8 @@ class Group(SQLModel, table=True):
     name: str
 
 class GroupMember(SQLModel, table=True):
+    # one membership per (group, user); invite redemption and member adds rely on it for ON CONFLICT DO NOTHING
+    __table_args__ = (Index("ix_groupmember_group_user", "group_id", "user_id", unique=True),)
     id: Optional[int] = Field(default=None, primary_key=True)
     group_id: int = Field(foreign_key="group.id")
     user_id: int = Field(foreign_key="user.id")
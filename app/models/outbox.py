@@ -0,0 +1,16 @@
+from datetime import datetime
+from typing import Optional
+from sqlmodel import Field, SQLModel
+
+class EmailOutbox(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    invite_id: Optional[int] = None  # no FK: invites are deleted once redeemed, the delivery record stays
+    to_email: str
+    subject: str
+    body: str
+    status: str = Field(default="pending", index=True)  # pending | sending | sent | failed
+    attempts: int = 0
+    next_attempt_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    sent_at: Optional[datetime] = None
@@ -0,0 +1,16 @@
+from datetime import date
+from typing import Optional
+from sqlalchemy import Index
+from sqlmodel import Field, SQLModel
+
+class SpendRollup(SQLModel, table=True):
+    # one row per (group, user, period, bucket start); maintained by the expense write paths
+    __table_args__ = (Index("ix_spendrollup_key", "group_id", "period", "bucket", "user_id", unique=True),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    group_id: int
+    user_id: int
+    period: str  # day | week | month
+    bucket: date
+    paid: float = 0.0  # amount this user paid
+    owed: float = 0.0  # this user's split of the group's spend
+    expenses: int = 0  # expenses this user paid for
@@ -0,0 +1,27 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Index
+from sqlmodel import Field, SQLModel
+
+class GroupChange(SQLModel, table=True):
+    # AUTOINCREMENT so sequence numbers are never reused after the log tail is compacted away
+    __table_args__ = (Index("ix_groupchange_group_seq", "group_id", "id"), {"sqlite_autoincrement": True})
+    id: Optional[int] = Field(default=None, primary_key=True)
+    group_id: int
+    entity: str  # expense | share | member (| group baseline marker)
+    entity_id: int
+    op: str  # insert | delete
+    data: Optional[str] = None  # JSON row image for inserts
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class SyncCursor(SQLModel, table=True):
+    __table_args__ = (Index("ix_synccursor_group_client", "group_id", "client_id", unique=True),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    group_id: int
+    client_id: str
+    last_seq: int = 0  # highest sequence the client has acknowledged
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class GroupSyncState(SQLModel, table=True):
+    group_id: int = Field(primary_key=True)
+    compacted_through: int = 0  # changes with id <= this are gone; older cursors need a snapshot
@@ -0,0 +1,164 @@
+# app/reconcile.py
+"""Offline reconciliation: recompute balances/settlements for every group and flag ledger inconsistencies.
+
+    python -m app.reconcile [--db db.sqlite] [--out reconcile-report] [--workers N] [--shard-size 200] [--resume]
+
+Groups are split into contiguous id ranges ("shards") processed by a multiprocessing pool, each worker
+holding its own read-only SQLite connection. Finished shards are appended to <out>/checkpoint.jsonl so an
+interrupted run continues with --resume. The summary is written to <out>/report.json and <out>/report.txt.
+"""
+import os, sys, json, time, sqlite3, argparse, multiprocessing
+from collections import Counter
+from typing import Dict, List, Tuple
+from app.services.balance_service import compute_nets
+from app.services.settlement_service import plan_settlements
+
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.dirname(__file__)), "db.sqlite")
+REQUIRED_INDEXES = {"ix_expense_group_id", "ix_expenseshare_expense_id", "ix_groupmember_group_user"}
+
+_conn = None
+
+def connect_ro(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+    conn.execute("PRAGMA query_only = ON")
+    conn.execute("PRAGMA cache_size = -65536")  # 64 MiB page cache per worker
+    return conn
+
+def _init_worker(db_path: str):
+    global _conn
+    _conn = connect_ro(db_path)
+
+def plan_shards(conn: sqlite3.Connection, shard_size: int) -> List[Tuple[int, int]]:
+    ids = [r[0] for r in conn.execute('SELECT id FROM "group" ORDER BY id')]
+    return [(ids[i], ids[min(i + shard_size, len(ids)) - 1]) for i in range(0, len(ids), shard_size)]
+
+def reconcile_shard(bounds: Tuple[int, int]) -> dict:
+    lo, hi = bounds
+    members: Dict[int, List[int]] = {}
+    for gid, uid in _conn.execute("SELECT group_id, user_id FROM groupmember WHERE group_id BETWEEN ? AND ?", bounds):
+        members.setdefault(gid, []).append(uid)
+    shares: Dict[int, list] = {}
+    rows = _conn.execute("SELECT es.expense_id, es.user_id, es.share FROM expenseshare es JOIN expense e ON e.id = es.expense_id "
+                         "WHERE e.group_id BETWEEN ? AND ? ORDER BY es.id", bounds)
+    for eid, uid, share in rows:
+        shares.setdefault(eid, []).append((uid, share))
+    member_sets = {gid: set(uids) for gid, uids in members.items()}
+    ledgers: Dict[int, list] = {}
+    issues = []
+    n_shares = 0
+    for eid, gid, payer_id, amount in _conn.execute("SELECT id, group_id, payer_id, amount FROM expense WHERE group_id BETWEEN ? AND ? "
+                                                      "ORDER BY group_id, created_at, id", bounds):
+        sh = shares.get(eid, [])
+        n_shares += len(sh)
+        ledgers.setdefault(gid, []).append((payer_id, amount, sh))
+        member_set = member_sets.get(gid, ())
+        for uid, _ in sh:
+            if uid not in member_set:
+                issues.append({"type": "share_for_non_member", "group_id": gid, "expense_id": eid, "user_id": uid})
+        if any(w is not None for _, w in sh) and sum(w for _, w in sh if w is not None and w > 0) <= 0:
+            issues.append({"type": "zero_weight_expense", "group_id": gid, "expense_id": eid})
+    groups = {}
+    for gid in sorted(set(members) | set(ledgers)):
+        nets = compute_nets(members.get(gid, []), ledgers.get(gid, []))
+        settlements = plan_settlements(nets)
+        groups[gid] = {
+            "members": len(members.get(gid, [])), "expenses": len(ledgers.get(gid, [])),
+            "imbalance": round(sum(nets.values()), 2),
+            "nets": nets, "settlements": [[s["from"], s["to"], s["amount"]] for s in settlements],
+        }
+    return {"shard": f"{lo}-{hi}", "groups": groups, "issues": issues, "expenses": sum(g["expenses"] for g in groups.values()), "shares": n_shares}
+
+def find_orphan_shares(conn: sqlite3.Connection) -> List[dict]:
+    rows = conn.execute("SELECT es.id, es.expense_id FROM expenseshare es LEFT JOIN expense e ON e.id = es.expense_id WHERE e.id IS NULL")
+    return [{"type": "orphan_share", "share_id": sid, "expense_id": eid} for sid, eid in rows]
+
+def _load_checkpoint(path: str, params: dict) -> Dict[str, dict]:
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("params") != params:
+            raise SystemExit(f"{path} was written with different parameters {header.get('params')}; rerun without --resume")
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # torn line from an interrupted run; that shard is redone
+            done[rec["shard"]] = rec
+    return done
+
+def render_table(summary: dict, issue_counts: Counter, worst: List[Tuple[int, int]]) -> str:
+    rows = [(k, str(v)) for k, v in summary.items()]
+    rows += [(f"issues: {k}", str(v)) for k, v in sorted(issue_counts.items())]
+    width = max(len(k) for k, _ in rows)
+    lines = [f"{'metric'.ljust(width)}  value", f"{'-' * width}  -----"]
+    lines += [f"{k.ljust(width)}  {v}" for k, v in rows]
+    if worst:
+        lines += ["", "group_id  issues", "--------  ------"] + [f"{str(g).ljust(8)}  {n}" for g, n in worst]
+    return "\n".join(lines) + "\n"
+
+def run(db_path: str, out_dir: str, workers: int, shard_size: int, resume: bool) -> dict:
+    started = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    checkpoint = os.path.join(out_dir, "checkpoint.jsonl")
+    conn = connect_ro(db_path)
+    existing = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    missing = REQUIRED_INDEXES - existing
+    if missing:
+        print(f"warning: missing indexes {sorted(missing)}; start the app once (init_db) to create them", file=sys.stderr)
+    shards = plan_shards(conn, shard_size)
+    params = {"db": os.path.abspath(db_path), "shard_size": shard_size, "shards": len(shards)}
+    done = _load_checkpoint(checkpoint, params) if resume else {}
+    if not resume or not os.path.exists(checkpoint):
+        with open(checkpoint, "w") as f:
+            f.write(json.dumps({"params": params}) + "\n")
+    todo = [b for b in shards if f"{b[0]}-{b[1]}" not in done]
+    if done:
+        print(f"resuming: {len(done)}/{len(shards)} shards already done", file=sys.stderr)
+
+    with open(checkpoint, "a") as ck, multiprocessing.Pool(workers, initializer=_init_worker, initargs=(db_path,)) as pool:
+        for result in pool.imap_unordered(reconcile_shard, todo):
+            ck.write(json.dumps(result, separators=(",", ":")) + "\n")
+            ck.flush()
+            done[result["shard"]] = result
+            print(f"\r[{len(done)}/{len(shards)} shards] {time.perf_counter() - started:7.1f}s", end="", file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+
+    issues = find_orphan_shares(conn)
+    groups = {}
+    n_expenses = n_shares = 0
+    for rec in done.values():
+        issues.extend(rec["issues"])
+        groups.update(rec["groups"])
+        n_expenses += rec["expenses"]
+        n_shares += rec["shares"]
+    issue_counts = Counter(i["type"] for i in issues)
+    per_group = Counter(i["group_id"] for i in issues if "group_id" in i)
+    summary = {
+        "groups": len(groups), "expenses": n_expenses, "shares": n_shares,
+        "settlements": sum(len(g["settlements"]) for g in groups.values()),
+        "unbalanced_groups": sum(1 for g in groups.values() if abs(g["imbalance"]) > 0.01),
+        "issues": len(issues), "seconds": round(time.perf_counter() - started, 1),
+    }
+    report = {"summary": summary, "issue_counts": dict(issue_counts), "issues": issues, "groups": groups}
+    with open(os.path.join(out_dir, "report.json"), "w") as f:
+        json.dump(report, f, separators=(",", ":"))
+    table = render_table(summary, issue_counts, per_group.most_common(10))
+    with open(os.path.join(out_dir, "report.txt"), "w") as f:
+        f.write(table)
+    print(table, end="")
+    return report
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m app.reconcile", description="Recompute balances and flag ledger inconsistencies.")
+    ap.add_argument("--db", default=DEFAULT_DB)
+    ap.add_argument("--out", default="reconcile-report")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--shard-size", type=int, default=200, help="groups per shard")
+    ap.add_argument("--resume", action="store_true", help="skip shards already in <out>/checkpoint.jsonl")
+    args = ap.parse_args(argv)
+    run(args.db, args.out, args.workers, args.shard_size, args.resume)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from sqlmodel import Session
+from app.db import engine
+from app.models.group import Group
+from app.routes.group import require_user
+from app.services.rollup_service import group_analytics, PERIODS
+
+router = APIRouter()
+
+@router.get("/api/group/{group_id}/analytics")
+def analytics(group_id: int, period: str = "month", start: Optional[date] = None, end: Optional[date] = None, user_id: Optional[int] = None, current_user = Depends(require_user)):
+    if period not in PERIODS:
+        raise HTTPException(400, f"period must be one of {', '.join(PERIODS)}")
+    with Session(engine) as s:
+        if not s.get(Group, group_id):
+            raise HTTPException(404, "Group not found")
+        return group_analytics(s, group_id, period, start, end, user_id)
@@ -5,6 +5,8 @@ from sqlmodel import Session, select
 from app.db import engine
 from app.models.expense import Expense, ExpenseShare
 from app.routes.group import require_user
+from app.services.change_log import record, expense_image, share_image
+from app.services.rollup_service import apply_expense
 
 router = APIRouter()
 
@@ -36,10 +38,13 @@ def add_expense(
 
     with Session(engine) as s:
         e = Expense(group_id=group_id, payer_id=payer_id, amount=round(amount,2), description=description)
-        s.add(e); s.commit(); s.refresh(e)
+        s.add(e); s.flush()
+        record(s, group_id, "expense", "insert", e.id, expense_image(e))
         for uid, sh in zip(participants, parsed_shares):
             es = ExpenseShare(expense_id=e.id, user_id=uid, share=(None if sh is None else round(float(sh),4)))
-            s.add(es)
+            s.add(es); s.flush()
+            record(s, group_id, "share", "insert", es.id, share_image(es))
+        apply_expense(s, e, [(uid, None if sh is None else round(float(sh),4)) for uid, sh in zip(participants, parsed_shares)])
         s.commit()
     return RedirectResponse(f"/group/{group_id}", status_code=303)
 
@@ -48,9 +53,12 @@ def delete_expense(group_id: int, expense_id: int, current_user = Depends(requir
     with Session(engine) as s:
         e = s.get(Expense, expense_id)
         if e:
-            shares = s.exec(select(ExpenseShare).where(ExpenseShare.expense_id==expense_id)).all()
+            shares = s.exec(select(ExpenseShare).where(ExpenseShare.expense_id==expense_id).order_by(ExpenseShare.id)).all()
+            apply_expense(s, e, [(sh.user_id, sh.share) for sh in shares], sign=-1)
             for sh in shares:
+                record(s, e.group_id, "share", "delete", sh.id)
                 s.delete(sh)
+            record(s, e.group_id, "expense", "delete", e.id)
             s.delete(e)
             s.commit()
     return RedirectResponse(f"/group/{group_id}", status_code=303)
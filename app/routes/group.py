@@ -2,13 +2,15 @@ from fastapi import APIRouter, Request, Form, Depends, HTTPException
 from fastapi.responses import RedirectResponse, HTMLResponse
 from sqlmodel import Session, select
 from typing import Optional
+from datetime import date
 from app.db import engine
 from app.models.group import Group, GroupMember
 from app.models.user import User
 from app.models.expense import Expense, ExpenseShare
-from app.models.invite import Invite
-from app.services.balance_service import compute_group_balances
-from app.services.settlement_service import suggest_settlements
+from app.services.compute_pool import group_balances_and_settlements
+from app.services.membership_service import parse_emails, add_members, add_members_by_email
+from app.services.email_outbox import wake_dispatcher
+from app.services.rollup_service import group_analytics, month_start
 
 router = APIRouter()
 
@@ -29,9 +31,9 @@ def index(request: Request):
 def create_group(name: str = Form(...), current_user = Depends(require_user)):
     with Session(engine) as s:
         g = Group(name=name)
-        s.add(g); s.commit(); s.refresh(g)
-        gm = GroupMember(group_id=g.id, user_id=current_user["id"])
-        s.add(gm); s.commit()
+        s.add(g); s.flush()
+        add_members(s, g.id, [current_user["id"]])
+        s.commit()
     return RedirectResponse("/", status_code=303)
 
 @router.get("/group/{group_id}", response_class=HTMLResponse)
@@ -55,34 +57,34 @@ def view_group(request: Request, group_id: int):
                 "payer_name": s.get(User, e.payer_id).name, "amount": e.amount,
                 "desc": e.description, "participants": parts
             })
-        nets = compute_group_balances(s, group_id)
+        nets, settlements = group_balances_and_settlements(s, group_id)
         balances = [{"id": m.id, "name": m.name, "net": nets.get(m.id, 0.0)} for m in members]
-        settlements = suggest_settlements(nets, s)
-    return request.app.templates.TemplateResponse("group.html", {"request": request, "group": group, "members": members, "expenses": exp_rows, "balances": balances, "settlements": settlements, "current_user": current_user})
-
-import secrets
-from fastapi import Form
+        # last 12 months from the rollup table; a handful of rows regardless of ledger size
+        since = month_start(date.today(), 11)
+        analytics = group_analytics(s, group_id, "month", start=since)
+        peak = max([b["paid"] for b in analytics["series"]] or [0])
+        for b in analytics["series"]:
+            b["pct"] = round(100 * b["paid"] / peak, 1) if peak else 0
+    return request.app.templates.TemplateResponse("group.html", {"request": request, "group": group, "members": members, "expenses": exp_rows, "balances": balances, "settlements": settlements, "analytics": analytics, "current_user": current_user})
 
 @router.post("/group/{group_id}/members/add")
 def add_member(group_id: int, name: Optional[str] = Form(None), email: Optional[str] = Form(None), current_user = Depends(require_user)):
     with Session(engine) as s:
-        if email:
-            existing = s.exec(select(User).where(User.email == email)).first()
-            if existing:
-                exists = s.exec(select(GroupMember).where(GroupMember.group_id==group_id, GroupMember.user_id==existing.id)).first()
-                if not exists:
-                    gm = GroupMember(group_id=group_id, user_id=existing.id)
-                    s.add(gm); s.commit()
-                return RedirectResponse(f"/group/{group_id}", status_code=303)
-            else:
-                token = secrets.token_urlsafe(24)
-                inv = Invite(group_id=group_id, email=email, token=token)
-                s.add(inv); s.commit()
-                return RedirectResponse(f"/group/{group_id}", status_code=303)
+        group = s.get(Group, group_id)
+        if not group:
+            raise HTTPException(404, "Group not found")
+        emails = parse_emails(email)
+        if emails:
+            # known users become members, the rest get invites plus outbox rows; all in one transaction
+            invites = add_members_by_email(s, group_id, emails, group.name)
+            s.commit()
+            if invites:
+                wake_dispatcher()
+            return RedirectResponse(f"/group/{group_id}", status_code=303)
         if not name:
             return RedirectResponse(f"/group/{group_id}", status_code=303)
         u = User(name=name)
-        s.add(u); s.commit(); s.refresh(u)
-        gm = GroupMember(group_id=group_id, user_id=u.id)
-        s.add(gm); s.commit()
+        s.add(u); s.flush()
+        add_members(s, group_id, [u.id])
+        s.commit()
     return RedirectResponse(f"/group/{group_id}", status_code=303)
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from sqlmodel import Session
+from app.db import engine
+from app.models.group import Group
+from app.routes.group import require_user
+from app.services.change_log import changes_since, MAX_BATCH
+
+router = APIRouter()
+
+@router.get("/api/group/{group_id}/changes")
+def group_changes(group_id: int, since: int = 0, client: Optional[str] = None, limit: int = MAX_BATCH, current_user = Depends(require_user)):
+    # since=0 (or a cursor older than the compacted log) returns a snapshot with reset=true
+    with Session(engine) as s:
+        if not s.get(Group, group_id):
+            raise HTTPException(404, "Group not found")
+        return changes_since(s, group_id, since, client, limit)
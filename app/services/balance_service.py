@@ -1,49 +1,57 @@
 # app/services/balance_service.py
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 from sqlmodel import Session, select
-from app.models.user import User
 from app.models.expense import Expense, ExpenseShare
+from app.models.group import GroupMember
 
-def compute_group_balances(session: Session, group_id: int) -> Dict[int, float]:
-    stmt_users = select(User).join_from(User, ExpenseShare)  # we will fetch users differently below
-    # fetch group members:
-    from app.models.group import GroupMember
-    members = session.exec(select(User).join(GroupMember, User.id == GroupMember.user_id).where(GroupMember.group_id == group_id)).all()
-    nets = {u.id: 0.0 for u in members}
+# compact, picklable ledger: (payer_id, amount, [(user_id, share), ...]) per expense, in created order
+Ledger = List[Tuple[int, float, List[Tuple[int, Optional[float]]]]]
 
-    expenses = session.exec(select(Expense).where(Expense.group_id == group_id).order_by(Expense.created_at)).all()
-    for e in expenses:
-        shares = session.exec(select(ExpenseShare).where(ExpenseShare.expense_id == e.id)).all()
-        if not shares:
-            continue
+def load_group_ledger(session: Session, group_id: int) -> Tuple[List[int], Ledger]:
+    member_ids = list(session.exec(select(GroupMember.user_id).where(GroupMember.group_id == group_id)).all())
+    expenses = session.exec(select(Expense.id, Expense.payer_id, Expense.amount).where(Expense.group_id == group_id).order_by(Expense.created_at, Expense.id)).all()
+    shares_by_expense = {}
+    rows = session.exec(select(ExpenseShare.expense_id, ExpenseShare.user_id, ExpenseShare.share).join(Expense, Expense.id == ExpenseShare.expense_id).where(Expense.group_id == group_id).order_by(ExpenseShare.id)).all()
+    for expense_id, user_id, share in rows:
+        shares_by_expense.setdefault(expense_id, []).append((user_id, share))
+    ledger = [(payer_id, amount, shares_by_expense.get(eid, [])) for eid, payer_id, amount in expenses]
+    return member_ids, ledger
 
-        if any(s.share is not None for s in shares):
-            weights = [float(s.share) if s.share is not None and float(s.share) > 0 else 0.0 for s in shares]
-            total_weight = sum(weights)
-            if total_weight <= 0:
-                per_amounts = {s.user_id: round(e.amount / len(shares),2) for s in shares}
-            else:
-                per_amounts = {}
-                for s,w in zip(shares, weights):
-                    per_amounts[s.user_id] = round(e.amount * (w / total_weight), 2)
-                allocated = round(sum(per_amounts.values()),2)
-                remainder = round(e.amount - allocated, 2)
-                if remainder != 0:
-                    per_amounts[e.payer_id] = per_amounts.get(e.payer_id,0.0) + remainder
-        else:
-            per_share = round(e.amount / len(shares), 2)
-            per_amounts = {s.user_id: per_share for s in shares}
-            allocated = round(per_share * len(shares), 2)
-            remainder = round(e.amount - allocated, 2)
-            if remainder != 0:
-                per_amounts[e.payer_id] = per_amounts.get(e.payer_id,0.0) + remainder
+def split_amounts(payer_id: int, amount: float, shares: List[Tuple[int, Optional[float]]]) -> Dict[int, float]:
+    """How much of one expense each participant owes (rounding remainder goes to the payer)."""
+    if any(sh is not None for _, sh in shares):
+        weights = [float(sh) if sh is not None and float(sh) > 0 else 0.0 for _, sh in shares]
+        total_weight = sum(weights)
+        if total_weight <= 0:
+            return {uid: round(amount / len(shares),2) for uid, _ in shares}
+        per_amounts = {}
+        for (uid, _), w in zip(shares, weights):
+            per_amounts[uid] = round(amount * (w / total_weight), 2)
+        allocated = round(sum(per_amounts.values()),2)
+    else:
+        per_share = round(amount / len(shares), 2)
+        per_amounts = {uid: per_share for uid, _ in shares}
+        allocated = round(per_share * len(shares), 2)
+    remainder = round(amount - allocated, 2)
+    if remainder != 0:
+        per_amounts[payer_id] = per_amounts.get(payer_id,0.0) + remainder
+    return per_amounts
 
-        for uid, amt in per_amounts.items():
+def compute_nets(member_ids: List[int], ledger: Ledger) -> Dict[int, float]:
+    nets = {uid: 0.0 for uid in member_ids}
+    for payer_id, amount, shares in ledger:
+        if not shares:
+            continue
+        for uid, amt in split_amounts(payer_id, amount, shares).items():
             nets.setdefault(uid, 0.0)
             nets[uid] -= amt
-        nets.setdefault(e.payer_id, 0.0)
-        nets[e.payer_id] += e.amount
+        nets.setdefault(payer_id, 0.0)
+        nets[payer_id] += amount
 
     for k in nets:
         nets[k] = round(nets[k], 2)
     return nets
+
+def compute_group_balances(session: Session, group_id: int) -> Dict[int, float]:
+    member_ids, ledger = load_group_ledger(session, group_id)
+    return compute_nets(member_ids, ledger)
@@ -0,0 +1,118 @@
+# app/services/change_log.py
+import os, json
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, select
+from app.models.expense import Expense, ExpenseShare
+from app.models.group import GroupMember
+from app.models.sync import GroupChange, SyncCursor, GroupSyncState
+
+CURSOR_TTL = timedelta(days=int(os.environ.get("SYNC_CURSOR_TTL_DAYS", "30")))  # idle clients stop holding back compaction
+MAX_BATCH = 1000
+ENTITIES = ("member", "expense", "share")
+
+def expense_image(e: Expense) -> dict:
+    return {"payer_id": e.payer_id, "amount": e.amount, "description": e.description, "created_at": e.created_at.isoformat()}
+
+def share_image(sh: ExpenseShare) -> dict:
+    return {"expense_id": sh.expense_id, "user_id": sh.user_id, "share": sh.share}
+
+def member_image(user_id: int) -> dict:
+    return {"user_id": user_id}
+
+def record(session: Session, group_id: int, entity: str, op: str, entity_id: int, data: Optional[dict] = None):
+    """Appends a change to the caller's transaction so it commits (or rolls back) with the mutation."""
+    session.add(GroupChange(group_id=group_id, entity=entity, op=op, entity_id=entity_id, data=None if data is None else json.dumps(data, separators=(",", ":"))))
+
+def record_members(session: Session, rows: Iterable[tuple]):
+    # rows: (membership_id, group_id, user_id) as returned by the membership inserts
+    for mid, group_id, user_id in rows:
+        record(session, group_id, "member", "insert", mid, member_image(user_id))
+
+def _empty_delta() -> Dict[str, dict]:
+    return {ent: {"upsert": {}, "delete": set()} for ent in ENTITIES}
+
+def _encode(delta: Dict[str, dict]) -> Dict[str, dict]:
+    out = {}
+    for ent, d in delta.items():
+        if d["upsert"] or d["delete"]:
+            out[ent] = {"upsert": [dict(id=i, **row) for i, row in d["upsert"].items()], "delete": sorted(d["delete"])}
+    return out
+
+def _snapshot(session: Session, group_id: int) -> Dict[str, dict]:
+    delta = _empty_delta()
+    for m in session.exec(select(GroupMember).where(GroupMember.group_id == group_id)).all():
+        delta["member"]["upsert"][m.id] = member_image(m.user_id)
+    for e in session.exec(select(Expense).where(Expense.group_id == group_id)).all():
+        delta["expense"]["upsert"][e.id] = expense_image(e)
+    shares = session.exec(select(ExpenseShare).join(Expense, Expense.id == ExpenseShare.expense_id).where(Expense.group_id == group_id)).all()
+    for sh in shares:
+        delta["share"]["upsert"][sh.id] = share_image(sh)
+    return _encode(delta)
+
+def _touch_cursor(session: Session, group_id: int, client_id: str, acked: int):
+    stmt = insert(SyncCursor).values(group_id=group_id, client_id=client_id, last_seq=acked, updated_at=datetime.utcnow())
+    session.exec(stmt.on_conflict_do_update(index_elements=["group_id", "client_id"], set_={"last_seq": func.max(SyncCursor.last_seq, stmt.excluded.last_seq), "updated_at": stmt.excluded.updated_at}))
+
+def _group_head(session: Session, group_id: int) -> int:
+    return session.exec(select(func.max(GroupChange.id)).where(GroupChange.group_id == group_id)).one() or 0
+
+def _snapshot_cursor(session: Session, group_id: int, floor: int) -> int:
+    # ids are global and only grow, so the newest id in the whole log is a valid cursor for any group
+    head = max(session.exec(select(func.max(GroupChange.id))).one() or 0, floor)
+    if not head:
+        # nothing logged yet: a baseline entry gives the snapshot a non-zero cursor so the next poll is incremental
+        record(session, group_id, "group", "baseline", group_id)
+        session.flush()
+        head = session.exec(select(func.max(GroupChange.id))).one()
+    return head
+
+def compact(session: Session, group_id: int) -> int:
+    """Drops log entries every live cursor has acknowledged; returns the new compaction floor."""
+    state = session.get(GroupSyncState, group_id) or GroupSyncState(group_id=group_id)
+    live_since = datetime.utcnow() - CURSOR_TTL
+    floor = session.exec(select(func.min(SyncCursor.last_seq)).where(SyncCursor.group_id == group_id, SyncCursor.updated_at >= live_since)).one()
+    if floor is not None:
+        # never past the newest entry, or later changes would land below the floor and force resets
+        floor = min(floor, _group_head(session, group_id))
+    if floor is not None and floor > state.compacted_through:
+        session.exec(delete(GroupChange).where(GroupChange.group_id == group_id, GroupChange.id <= floor))
+        state.compacted_through = floor
+        session.add(state)
+    return state.compacted_through
+
+def changes_since(session: Session, group_id: int, since: int, client_id: Optional[str] = None, limit: int = MAX_BATCH) -> dict:
+    """Coalesced deltas after `since`, or a full snapshot when the cursor is new or older than the compacted log."""
+    limit = max(1, min(limit, MAX_BATCH))
+    state = session.get(GroupSyncState, group_id)
+    floor = state.compacted_through if state else 0
+    if client_id:
+        # a client can only have seen what exists; an inflated `since` must not drag the floor past the log head
+        _touch_cursor(session, group_id, client_id, min(since, max(_group_head(session, group_id), floor)))
+    if since <= 0 or since < floor:
+        # read the head before the rows: changes racing the snapshot get replayed, and replays are idempotent
+        head = _snapshot_cursor(session, group_id, floor)
+        result = {"reset": True, "cursor": head, "has_more": False, "changes": _snapshot(session, group_id)}
+    else:
+        rows = session.exec(select(GroupChange).where(GroupChange.group_id == group_id, GroupChange.id > since).order_by(GroupChange.id).limit(limit + 1)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        delta = _empty_delta()
+        for c in rows:
+            if c.entity not in delta:
+                continue  # baseline markers
+            d = delta[c.entity]
+            if c.op == "insert":
+                d["delete"].discard(c.entity_id)
+                d["upsert"][c.entity_id] = json.loads(c.data) if c.data else {}
+            else:
+                # insert+delete inside one batch cancel out; the client may still hold the row from an earlier batch
+                d["upsert"].pop(c.entity_id, None)
+                d["delete"].add(c.entity_id)
+        result = {"reset": False, "cursor": rows[-1].id if rows else since, "has_more": has_more, "changes": _encode(delta)}
+    if client_id:
+        compact(session, group_id)
+    session.commit()
+    return result
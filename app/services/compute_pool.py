@@ -0,0 +1,138 @@
+# app/services/compute_pool.py
+import os, time, threading, multiprocessing
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Tuple
+from sqlmodel import Session
+from app.services.balance_service import load_group_ledger, compute_nets
+from app.services.settlement_service import plan_settlements, add_names
+
+# groups with fewer expenses than the threshold are always computed inline
+POOL_WORKERS = int(os.environ.get("COMPUTE_POOL_WORKERS", "2"))
+POOL_THRESHOLD = int(os.environ.get("COMPUTE_POOL_THRESHOLD", "5000"))
+POOL_TIMEOUT = float(os.environ.get("COMPUTE_POOL_TIMEOUT", "2.0"))
+MAX_PENDING = int(os.environ.get("COMPUTE_POOL_MAX_PENDING", str(max(1, POOL_WORKERS) * 2)))
+STALE_CACHE_SIZE = 256
+
+_pool = None
+_lock = threading.Lock()
+_last_results: "OrderedDict[int, Tuple[Dict[int, float], List[dict]]]" = OrderedDict()
+_inflight: Dict[int, Future] = {}  # at most one pool job per group; later requests attach to it
+_metrics = {"inline": 0, "submitted": 0, "attached": 0, "saturated": 0, "completed": 0, "timeouts": 0, "errors": 0, "stale_served": 0, "pool_ms_total": 0.0}
+
+def _compute(member_ids, ledger):
+    # runs in the worker process; only plain ids/floats cross the process boundary
+    nets = compute_nets(member_ids, ledger)
+    return nets, plan_settlements(nets)
+
+def get_pool():
+    global _pool
+    with _lock:
+        if _pool is None and POOL_WORKERS > 0:
+            _pool = ProcessPoolExecutor(max_workers=POOL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def shutdown_pool(broken=None):
+    # broken: only drop the pool if it is still this (dead) executor, not one already rebuilt in its place
+    global _pool
+    with _lock:
+        if _pool is not None and (broken is None or _pool is broken):
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+def pool_metrics() -> dict:
+    with _lock:
+        m = dict(_metrics)
+        m.update(workers=POOL_WORKERS, threshold=POOL_THRESHOLD, timeout=POOL_TIMEOUT, running=_pool is not None, cached_groups=len(_last_results), pending=len(_inflight), max_pending=MAX_PENDING)
+    return m
+
+def _count(key, by=1):
+    with _lock:
+        _metrics[key] += by
+
+def _remember(group_id, result):
+    with _lock:
+        _last_results[group_id] = result
+        _last_results.move_to_end(group_id)
+        while len(_last_results) > STALE_CACHE_SIZE:
+            _last_results.popitem(last=False)
+
+def _submit(group_id, member_ids, ledger):
+    """Returns the group's in-flight future, a new one, or None when the pool is off, broken or MAX_PENDING groups are queued."""
+    pool = get_pool()
+    if pool is None:
+        return None
+    with _lock:
+        future = _inflight.get(group_id)
+        if future is not None:
+            _metrics["attached"] += 1
+            return future
+        if len(_inflight) >= MAX_PENDING:
+            _metrics["saturated"] += 1
+            return None
+        started = time.perf_counter()
+        try:
+            future = pool.submit(_compute, member_ids, ledger)
+        except (BrokenProcessPool, RuntimeError):
+            # a worker died, or shutdown_pool() ran since get_pool(); the next request gets a fresh pool
+            future = None
+            _metrics["errors"] += 1
+        else:
+            _inflight[group_id] = future
+            _metrics["submitted"] += 1
+    if future is None:
+        shutdown_pool(broken=pool)
+        return None
+
+    def _done(f):
+        with _lock:
+            if _inflight.get(group_id) is f:
+                del _inflight[group_id]
+        error = None if f.cancelled() else f.exception()
+        if f.cancelled() or error is not None:
+            _count("errors")
+            if isinstance(error, BrokenProcessPool):
+                # nobody may be waiting on this future; drop the dead executor here so the next submit rebuilds it
+                shutdown_pool(broken=pool)
+            return
+        _count("completed")
+        _count("pool_ms_total", (time.perf_counter() - started) * 1000)
+        _remember(group_id, f.result())
+    future.add_done_callback(_done)
+    return future
+
+def _inline(group_id, member_ids, ledger):
+    _count("inline")
+    result = _compute(member_ids, ledger)
+    _remember(group_id, result)
+    return result
+
+def _named(result, session):
+    nets, settlements = result
+    # copies: the cached settlement dicts are shared between requests
+    return nets, add_names([dict(s) for s in settlements], session)
+
+def group_balances_and_settlements(session: Session, group_id: int) -> Tuple[Dict[int, float], List[dict]]:
+    member_ids, ledger = load_group_ledger(session, group_id)
+    if len(ledger) < POOL_THRESHOLD:
+        _count("inline")
+        nets, settlements = _compute(member_ids, ledger)
+        return nets, add_names(settlements, session)
+
+    with _lock:
+        stale = _last_results.get(group_id)
+    future = _submit(group_id, member_ids, ledger)
+    if future is not None:
+        try:
+            return _named(future.result(timeout=POOL_TIMEOUT), session)
+        except FutureTimeout:
+            # the late result still refreshes the cache through _done
+            _count("timeouts")
+        except Exception:
+            pass  # counted, and a broken pool reset, by _done
+    if stale is not None:
+        _count("stale_served")
+        return _named(stale, session)
+    # pool off, saturated, failed or slow, and nothing cached yet for this group
+    return _named(_inline(group_id, member_ids, ledger), session)
@@ -0,0 +1,185 @@
+# app/services/email_outbox.py
+import os, time, asyncio, logging, smtplib
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import update
+from sqlmodel import Session, select
+from app.models.invite import Invite
+from app.models.outbox import EmailOutbox
+
+log = logging.getLogger(__name__)
+
+SMTP_HOST = os.environ.get("SMTP_HOST")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", "25"))
+SMTP_USER = os.environ.get("SMTP_USER")
+SMTP_PASSWORD = os.environ.get("SMTP_PASSWORD")
+SMTP_STARTTLS = os.environ.get("SMTP_STARTTLS", "0") == "1"
+MAIL_FROM = os.environ.get("MAIL_FROM", "no-reply@expense-splitter.local")
+APP_BASE_URL = os.environ.get("APP_BASE_URL", "http://localhost:8000")
+
+BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", "50"))
+RATE_PER_SEC = float(os.environ.get("OUTBOX_RATE_PER_SEC", "5"))
+MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", "6"))
+BACKOFF_BASE = float(os.environ.get("OUTBOX_BACKOFF_SECONDS", "30"))
+BACKOFF_MAX = float(os.environ.get("OUTBOX_BACKOFF_MAX_SECONDS", "3600"))
+POLL_INTERVAL = float(os.environ.get("OUTBOX_POLL_INTERVAL", "5"))
+CLAIM_LEASE = timedelta(minutes=10)  # a claimed batch whose worker died becomes due again after this
+
+def queue_invite_emails(session: Session, invites: List[Invite], group_name: str = ""):
+    """Adds one outbox row per invite to the caller's transaction. Invites must have ids (flush first)."""
+    link = f"{APP_BASE_URL}/login"
+    for inv in invites:
+        session.add(EmailOutbox(
+            invite_id=inv.id, to_email=inv.email,
+            subject=f"You've been invited to {group_name or 'a group'} on Expense Splitter",
+            body=f"You've been added to {group_name or 'a group'} on Expense Splitter.\n\nSign in with Google using {inv.email} to join: {link}\n",
+        ))
+
+def claim_batch(engine, limit: int = BATCH_SIZE) -> List[Tuple[int, str, str, str]]:
+    now = datetime.utcnow()
+    with Session(engine) as s:
+        due = select(EmailOutbox.id).where(EmailOutbox.status.in_(["pending", "sending"]), EmailOutbox.next_attempt_at <= now).order_by(EmailOutbox.next_attempt_at).limit(limit)
+        stmt = (update(EmailOutbox)
+                .where(EmailOutbox.id.in_(due), EmailOutbox.status.in_(["pending", "sending"]), EmailOutbox.next_attempt_at <= now)
+                .values(status="sending", next_attempt_at=now + CLAIM_LEASE)
+                .returning(EmailOutbox.id, EmailOutbox.to_email, EmailOutbox.subject, EmailOutbox.body))
+        rows = [tuple(r) for r in s.exec(stmt).all()]
+        s.commit()
+    return sorted(rows)
+
+def send_batch(messages: List[Tuple[int, str, str, str]], host: str, port: int) -> Dict[int, Optional[str]]:
+    """Sends a batch over a single SMTP connection. Returns {outbox_id: error or None}."""
+    results: Dict[int, Optional[str]] = {}
+    try:
+        smtp = smtplib.SMTP(host, port, timeout=30)
+    except (OSError, smtplib.SMTPException) as e:
+        return {mid: f"connect: {e}" for mid, *_ in messages}
+    # OSError covers socket resets/timeouts and ssl.SSLError from starttls; every claimed id must get a result
+    # or its row stays "sending" until the lease runs out
+    try:
+        try:
+            if SMTP_STARTTLS:
+                smtp.starttls()
+            if SMTP_USER:
+                smtp.login(SMTP_USER, SMTP_PASSWORD or "")
+        except (OSError, smtplib.SMTPException) as e:
+            return {mid: f"auth: {e}" for mid, *_ in messages}
+        for i, (mid, to, subject, body) in enumerate(messages):
+            if i and RATE_PER_SEC > 0:
+                time.sleep(1.0 / RATE_PER_SEC)
+            msg = EmailMessage()
+            msg["From"], msg["To"], msg["Subject"] = MAIL_FROM, to, subject
+            msg.set_content(body)
+            try:
+                smtp.send_message(msg)
+                results[mid] = None
+            except (smtplib.SMTPServerDisconnected, OSError) as e:
+                # connection is gone; everything not yet sent is retried with the next batch
+                for rest, *_ in messages[i:]:
+                    results[rest] = f"disconnected: {e}"
+                break
+            except smtplib.SMTPException as e:
+                results[mid] = str(e)
+    finally:
+        try:
+            smtp.quit()
+        except (OSError, smtplib.SMTPException):
+            smtp.close()
+    return results
+
+def record_results(engine, results: Dict[int, Optional[str]]):
+    now = datetime.utcnow()
+    with Session(engine) as s:
+        for row in s.exec(select(EmailOutbox).where(EmailOutbox.id.in_(list(results)))).all():
+            error = results[row.id]
+            row.attempts += 1
+            if error is None:
+                row.status, row.sent_at, row.last_error = "sent", now, None
+            else:
+                row.last_error = error[:500]
+                if row.attempts >= MAX_ATTEMPTS:
+                    row.status = "failed"
+                else:
+                    row.status = "pending"
+                    row.next_attempt_at = now + timedelta(seconds=min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (row.attempts - 1)))
+            s.add(row)
+        s.commit()
+
+def dispatch_once(engine, host: str = None, port: int = None) -> int:
+    """Claims, sends and records one batch; returns the number of messages attempted."""
+    batch = claim_batch(engine)
+    if not batch:
+        return 0
+    results = send_batch(batch, host or SMTP_HOST, port or SMTP_PORT)
+    record_results(engine, results)
+    sent = sum(1 for e in results.values() if e is None)
+    log.info("outbox batch: %d sent, %d failed", sent, len(results) - sent)
+    return len(batch)
+
+class OutboxDispatcher:
+    """Background asyncio task draining the email outbox; blocking SMTP/DB work runs in a thread."""
+
+    def __init__(self, engine, host: str = None, port: int = None, poll_interval: float = POLL_INTERVAL):
+        self.engine = engine
+        self.host = host or SMTP_HOST
+        self.port = port or SMTP_PORT
+        self.poll_interval = poll_interval
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake = asyncio.Event()
+
+    def start(self):
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._task = self._loop.create_task(self._run())
+
+    def notify(self):
+        # safe from request worker threads; wakes the loop so new mail skips the poll wait
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                attempted = await asyncio.to_thread(dispatch_once, self.engine, self.host, self.port)
+            except Exception:
+                log.exception("outbox dispatch failed")
+                attempted = 0
+            if attempted:
+                continue  # keep draining while there is backlog
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+dispatcher: Optional[OutboxDispatcher] = None
+
+def start_dispatcher(engine) -> Optional[OutboxDispatcher]:
+    global dispatcher
+    if not SMTP_HOST:
+        log.info("SMTP_HOST not set; invite emails stay queued in the outbox")
+        return None
+    dispatcher = OutboxDispatcher(engine)
+    dispatcher.start()
+    return dispatcher
+
+async def stop_dispatcher():
+    global dispatcher
+    if dispatcher is not None:
+        await dispatcher.stop()
+        dispatcher = None
+
+def wake_dispatcher():
+    if dispatcher is not None:
+        dispatcher.notify()
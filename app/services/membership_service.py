@@ -0,0 +1,48 @@
+# app/services/membership_service.py
+import re, secrets
+from typing import Iterable, List
+from sqlalchemy import delete, literal
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, select
+from app.models.user import User
+from app.models.group import GroupMember
+from app.models.invite import Invite
+from app.services.email_outbox import queue_invite_emails
+from app.services.change_log import record_members
+
+def parse_emails(raw: str) -> List[str]:
+    # "a@x.com, b@y.com" / one per line -> unique, order-preserving list
+    seen = {}
+    for e in re.split(r"[\s,;]+", raw or ""):
+        if e:
+            seen.setdefault(e, None)
+    return list(seen)
+
+def add_members(session: Session, group_id: int, user_ids: Iterable[int]):
+    rows = [{"group_id": group_id, "user_id": uid} for uid in set(user_ids)]
+    if rows:
+        stmt = insert(GroupMember).values(rows).on_conflict_do_nothing(index_elements=["group_id", "user_id"])
+        # RETURNING only yields rows that were actually inserted, so the change log skips existing members
+        record_members(session, session.exec(stmt.returning(GroupMember.id, GroupMember.group_id, GroupMember.user_id)).all())
+
+def add_members_by_email(session: Session, group_id: int, emails: List[str], group_name: str = "") -> List[Invite]:
+    """Adds known users as members and creates invites (with queued emails) for the rest; returns the new invites. Caller commits."""
+    if not emails:
+        return []
+    known = session.exec(select(User.id, User.email).where(User.email.in_(emails))).all()
+    add_members(session, group_id, [uid for uid, _ in known])
+    known_emails = {e for _, e in known}
+    pending = set(session.exec(select(Invite.email).where(Invite.group_id == group_id, Invite.email.in_(emails))).all())
+    invites = [Invite(group_id=group_id, email=e, token=secrets.token_urlsafe(24)) for e in emails if e not in known_emails and e not in pending]
+    session.add_all(invites)
+    if invites:
+        session.flush()
+        queue_invite_emails(session, invites, group_name)
+    return invites
+
+def redeem_invites(session: Session, user_id: int, email: str):
+    """Turns every pending invite for email into a membership with one INSERT ... SELECT and one DELETE. Caller commits."""
+    source = select(Invite.group_id, literal(user_id)).where(Invite.email == email)
+    stmt = insert(GroupMember).from_select(["group_id", "user_id"], source).on_conflict_do_nothing(index_elements=["group_id", "user_id"])
+    record_members(session, session.exec(stmt.returning(GroupMember.id, GroupMember.group_id, GroupMember.user_id)).all())
+    session.exec(delete(Invite).where(Invite.email == email))
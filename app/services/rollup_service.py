@@ -0,0 +1,134 @@
+# app/services/rollup_service.py
+"""Pre-aggregated spend per (group, user, period, bucket).
+
+Expense writes call apply_expense() inside their transaction; backfill() rebuilds from the ledger:
+
+    python -m app.services.rollup_service [--group ID ...]
+"""
+import argparse
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, select
+from app.models.user import User
+from app.models.group import Group
+from app.models.expense import Expense, ExpenseShare
+from app.models.rollup import SpendRollup
+from app.services.balance_service import split_amounts
+
+PERIODS = ("day", "week", "month")
+CHUNK = 500
+
+def bucket_start(ts: datetime, period: str) -> date:
+    d = ts.date()
+    if period == "week":
+        return d - timedelta(days=d.weekday())
+    if period == "month":
+        return d.replace(day=1)
+    return d
+
+def month_start(d: date, months_back: int = 0) -> date:
+    # first day of the month `months_back` calendar months before d
+    y, m = divmod(d.year * 12 + d.month - 1 - months_back, 12)
+    return date(y, m + 1, 1)
+
+def _accumulate(agg: dict, group_id: int, created_at: datetime, payer_id: int, amount: float, shares: List[Tuple[int, Optional[float]]], sign: int = 1):
+    # mirrors compute_nets: an expense without shares moves no money
+    if not shares:
+        return
+    per_user = {payer_id: [amount, 0.0, 1]}
+    for uid, amt in split_amounts(payer_id, amount, shares).items():
+        per_user.setdefault(uid, [0.0, 0.0, 0])[1] += amt
+    for period in PERIODS:
+        bucket = bucket_start(created_at, period)
+        for uid, (paid, owed, n) in per_user.items():
+            row = agg.setdefault((group_id, uid, period, bucket), [0.0, 0.0, 0])
+            row[0] += sign * paid; row[1] += sign * owed; row[2] += sign * n
+
+def _rows(agg: dict) -> List[dict]:
+    return [{"group_id": g, "user_id": u, "period": p, "bucket": b, "paid": round(v[0], 2), "owed": round(v[1], 2), "expenses": v[2]} for (g, u, p, b), v in agg.items()]
+
+def _upsert(session: Session, rows: List[dict]):
+    for i in range(0, len(rows), CHUNK):
+        stmt = insert(SpendRollup).values(rows[i:i + CHUNK])
+        session.exec(stmt.on_conflict_do_update(
+            index_elements=["group_id", "period", "bucket", "user_id"],
+            set_={"paid": SpendRollup.paid + stmt.excluded.paid, "owed": SpendRollup.owed + stmt.excluded.owed, "expenses": SpendRollup.expenses + stmt.excluded.expenses},
+        ))
+
+def apply_expense(session: Session, expense: Expense, shares: List[Tuple[int, Optional[float]]], sign: int = 1):
+    """Adds (sign=1) or removes (sign=-1) one expense from the rollups in the caller's transaction."""
+    agg = {}
+    _accumulate(agg, expense.group_id, expense.created_at, expense.payer_id, expense.amount, shares, sign)
+    _upsert(session, _rows(agg))
+    if sign < 0:
+        # rows emptied by the delete would still show up as $0.00 bars and 0% members
+        session.exec(delete(SpendRollup).where(SpendRollup.group_id == expense.group_id, SpendRollup.expenses <= 0,
+                                               func.abs(SpendRollup.paid) < 0.005, func.abs(SpendRollup.owed) < 0.005))
+
+def backfill(session: Session, group_ids: Optional[List[int]] = None) -> int:
+    """Rebuilds rollups from the raw ledger, one group per transaction; returns rows written."""
+    if group_ids is None:
+        group_ids = list(session.exec(select(Group.id).order_by(Group.id)).all())
+    written = 0
+    for gid in group_ids:
+        session.exec(delete(SpendRollup).where(SpendRollup.group_id == gid))
+        shares = {}
+        rows = session.exec(select(ExpenseShare.expense_id, ExpenseShare.user_id, ExpenseShare.share).join(Expense, Expense.id == ExpenseShare.expense_id).where(Expense.group_id == gid).order_by(ExpenseShare.id)).all()
+        for eid, uid, share in rows:
+            shares.setdefault(eid, []).append((uid, share))
+        agg = {}
+        for eid, payer_id, amount, created_at in session.exec(select(Expense.id, Expense.payer_id, Expense.amount, Expense.created_at).where(Expense.group_id == gid)).all():
+            _accumulate(agg, gid, created_at, payer_id, amount, shares.get(eid, []))
+        _upsert(session, _rows(agg))
+        session.commit()
+        written += len(agg)
+    return written
+
+def backfill_if_empty(session: Session) -> int:
+    # first start after the rollup table was added: seed it from existing expenses
+    if session.exec(select(SpendRollup.id).limit(1)).first() is None and session.exec(select(Expense.id).limit(1)).first() is not None:
+        return backfill(session)
+    return 0
+
+def group_analytics(session: Session, group_id: int, period: str = "month", start: Optional[date] = None, end: Optional[date] = None, user_id: Optional[int] = None, top: int = 5) -> dict:
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of {PERIODS}")
+    q = select(SpendRollup.bucket, SpendRollup.user_id, SpendRollup.paid, SpendRollup.owed, SpendRollup.expenses).where(SpendRollup.group_id == group_id, SpendRollup.period == period)
+    if start:
+        q = q.where(SpendRollup.bucket >= bucket_start(datetime.combine(start, datetime.min.time()), period))
+    if end:
+        q = q.where(SpendRollup.bucket <= end)
+    if user_id is not None:
+        q = q.where(SpendRollup.user_id == user_id)
+    series: Dict[date, list] = {}
+    totals: Dict[int, list] = {}
+    for bucket, uid, paid, owed, n in session.exec(q.order_by(SpendRollup.bucket)).all():
+        s = series.setdefault(bucket, [0.0, 0.0, 0])
+        s[0] += paid; s[1] += owed; s[2] += n
+        t = totals.setdefault(uid, [0.0, 0.0])
+        t[0] += paid; t[1] += owed
+    names = dict(session.exec(select(User.id, User.name).where(User.id.in_(list(totals)))).all()) if totals else {}
+    spend = sum(t[1] for t in totals.values())
+    top_payers = sorted(totals.items(), key=lambda kv: kv[1][0], reverse=True)[:top]
+    return {
+        "period": period,
+        # each expense counts once, on its payer's row, so a bucket at 0 only holds rows zeroed by deletes
+        "series": [{"bucket": b.isoformat(), "paid": round(v[0], 2), "owed": round(v[1], 2), "expenses": v[2]} for b, v in series.items() if v[2] > 0],
+        "top_payers": [{"user_id": uid, "name": names.get(uid), "paid": round(t[0], 2)} for uid, t in top_payers if t[0] > 0.005],
+        "member_share": [{"user_id": uid, "name": names.get(uid), "owed": round(t[1], 2), "pct": round(100 * t[1] / spend, 1) if spend else 0.0}
+                         for uid, t in sorted(totals.items(), key=lambda kv: kv[1][1], reverse=True) if round(t[1], 2) != 0],
+    }
+
+def main(argv=None):
+    from app.db import engine, init_db
+    ap = argparse.ArgumentParser(prog="python -m app.services.rollup_service", description="Rebuild spend rollups from the expense ledger.")
+    ap.add_argument("--group", type=int, action="append", help="only these group ids (repeatable)")
+    args = ap.parse_args(argv)
+    init_db()
+    with Session(engine) as s:
+        print(f"{backfill(s, args.group)} rollup rows written")
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ from typing import Dict, List
 from sqlmodel import Session
 from app.models.user import User
 
-def suggest_settlements(nets: Dict[int, float], session: Session) -> List[dict]:
+def plan_settlements(nets: Dict[int, float]) -> List[dict]:
     creditors = [(uid, amt) for uid, amt in nets.items() if amt > 0.005]
     debtors = [(uid, -amt) for uid, amt in nets.items() if amt < -0.005]
     creditors.sort(key=lambda x: x[1], reverse=True)
@@ -26,8 +26,13 @@ def suggest_settlements(nets: Dict[int, float], session: Session) -> List[dict]:
             j += 1
         else:
             creditors[j] = (creditor_id, cred_amt)
-    # add names
+    return settlements
+
+def add_names(settlements: List[dict], session: Session) -> List[dict]:
     for s in settlements:
         s["from_name"] = session.get(User, s["from"]).name
         s["to_name"] = session.get(User, s["to"]).name
     return settlements
+
+def suggest_settlements(nets: Dict[int, float], session: Session) -> List[dict]:
+    return add_names(plan_settlements(nets), session)
@@ -62,6 +62,8 @@ class Invite(SQLModel, table=True):
 app = FastAPI()
 BASE_DIR = os.path.dirname(__file__)
 templates = Jinja2Templates(directory=os.path.join(BASE_DIR, "templates"))
+from app.assets import static_url
+templates.env.globals["static_url"] = static_url  # templates reference static_url(); unbuilt -> plain /static path
 app.mount("/static", StaticFiles(directory=os.path.join(BASE_DIR, "static")), name="static")
 
 # Session middleware for simple server-side session (signed cookie)
@@ -84,7 +86,12 @@ oauth.register(
 # ----------------------
 DB_FILE = os.path.join(BASE_DIR, "db.sqlite")
 engine = create_engine(f"sqlite:///{DB_FILE}", echo=False, connect_args={"check_same_thread": False})
-SQLModel.metadata.create_all(engine)
+
+@app.on_event("startup")
+def on_startup():
+    # moved out of import time. Plain create_all on purpose: PRAGMA user_version belongs to app.main's
+    # schema fingerprint, and this app's models would overwrite it on every start
+    SQLModel.metadata.create_all(engine)
 
 # ----------------------
 # Utility: require logged-in user
@@ -0,0 +1,21 @@
+# tests/conftest.py
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, Session, create_engine
+import app.models  # noqa: F401  registers every table on SQLModel.metadata
+import app.routes.group, app.routes.expense, app.routes.sync, app.routes.analytics
+
+@pytest.fixture
+def engine(monkeypatch):
+    # one shared in-memory database, swapped in for the module-level engine the routes use
+    eng = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(eng)
+    for module in (app.routes.group, app.routes.expense, app.routes.sync, app.routes.analytics):
+        monkeypatch.setattr(module, "engine", eng)
+    yield eng
+    eng.dispose()
+
+@pytest.fixture
+def session(engine):
+    with Session(engine) as s:
+        yield s
@@ -0,0 +1,38 @@
+# tests/test_assets.py
+import pytest
+from starlette.applications import Starlette
+from starlette.testclient import TestClient
+from app import assets
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "style.css").write_text("body { color: red; }\n" * 50)
+    monkeypatch.setattr(assets, "BUILD_DIR", str(tmp_path / "build"))
+    monkeypatch.setattr(assets, "manifest", {})
+    monkeypatch.setattr(assets, "_fingerprinted", set())
+    assets.build_static(str(src))
+    app = Starlette()
+    app.add_middleware(assets.PrecompressedStaticMiddleware)
+    return TestClient(app)
+
+def _encoding(client, accept):
+    r = client.get(assets.static_url("style.css"), headers={"accept-encoding": accept})
+    assert r.status_code == 200 and r.headers["cache-control"] == assets.IMMUTABLE_CACHE
+    return r.headers.get("content-encoding")
+
+@pytest.mark.parametrize("accept, expected", [
+    ("gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("identity", None),
+    ("gzip;q=0.5, br;q=0", "gzip"),
+    ("*;q=0", None),
+    ("*", "br" if assets.brotli else "gzip"),
+])
+def test_variant_follows_accept_encoding_q_values(client, accept, expected):
+    assert _encoding(client, accept) == expected
+
+def test_accepted_encodings_parses_q_values():
+    assert assets.accepted_encodings("br;q=1.0, GZIP ; q=0.5, *;q=0, deflate;q=x") == {"br": 1.0, "gzip": 0.5, "*": 0.0, "deflate": 0.0}
+    assert assets.accepted_encodings("") == {}
@@ -0,0 +1,85 @@
+# tests/test_change_log.py
+from sqlmodel import select
+from app.models import User, Group, Expense, GroupChange, GroupSyncState
+from app.routes import group as group_routes, expense as expense_routes
+from app.services.change_log import changes_since
+
+USER = {"id": 1}
+
+def _group(session):
+    session.add_all([User(name="a"), User(name="b", email="b@example.com")])
+    session.commit()
+    group_routes.create_group(name="g", current_user=USER)
+    group_routes.add_member(1, name=None, email="b@example.com", current_user=USER)
+    return 1
+
+def _expense(amount, payer_id=1):
+    expense_routes.add_expense(1, payer_id=payer_id, amount=amount, description="x", participants=[1, 2], shares=None, current_user=USER)
+
+def test_snapshot_then_incremental(engine, session):
+    gid = _group(session)
+    first = changes_since(session, gid, 0, "c1")
+    assert first["reset"] and first["cursor"] > 0
+    assert len(first["changes"]["member"]["upsert"]) == 2
+    _expense(10)
+    delta = changes_since(session, gid, first["cursor"], "c1")
+    assert not delta["reset"]
+    assert [e["amount"] for e in delta["changes"]["expense"]["upsert"]] == [10]
+    assert len(delta["changes"]["share"]["upsert"]) == 2
+    assert "member" not in delta["changes"]
+    assert changes_since(session, gid, delta["cursor"], "c1")["changes"] == {}
+
+def test_insert_then_delete_in_one_batch_cancels(engine, session):
+    gid = _group(session)
+    cursor = changes_since(session, gid, 0)["cursor"]
+    _expense(10)
+    _expense(20)
+    expense_routes.delete_expense(gid, 1, current_user=USER)
+    changes = changes_since(session, gid, cursor)["changes"]
+    assert [e["amount"] for e in changes["expense"]["upsert"]] == [20]
+    assert changes["expense"]["delete"] == [1]
+    assert {s["expense_id"] for s in changes["share"]["upsert"]} == {2}
+
+def test_paged_batches_cover_every_change(engine, session):
+    gid = _group(session)
+    cursor = changes_since(session, gid, 0)["cursor"]
+    for amount in (1, 2, 3):
+        _expense(amount)
+    seen, has_more = [], True
+    while has_more:
+        page = changes_since(session, gid, cursor, limit=2)
+        seen += [e["amount"] for e in page["changes"].get("expense", {}).get("upsert", [])]
+        cursor, has_more = page["cursor"], page["has_more"]
+    assert seen == [1, 2, 3]
+
+def test_group_without_log_rows_gets_a_usable_cursor(engine, session):
+    # data written before the change log existed
+    session.add(User(name="a")); session.add(Group(name="old")); session.commit()
+    session.add(Expense(group_id=1, payer_id=1, amount=5, description="x")); session.commit()
+    assert session.exec(select(GroupChange)).all() == []
+    first = changes_since(session, 1, 0, "c1")
+    assert first["reset"] and first["cursor"] > 0
+    assert len(first["changes"]["expense"]["upsert"]) == 1
+    again = changes_since(session, 1, first["cursor"], "c1")
+    assert not again["reset"] and again["changes"] == {}
+
+def test_inflated_since_cannot_push_compaction_past_head(engine, session):
+    gid = _group(session)
+    head = session.exec(select(GroupChange.id).order_by(GroupChange.id.desc())).first()
+    changes_since(session, gid, 10**9, "rogue")
+    assert session.get(GroupSyncState, gid).compacted_through == head
+    cursor = changes_since(session, gid, 0, "c1")["cursor"]
+    _expense(10)
+    delta = changes_since(session, gid, cursor, "c1")
+    assert not delta["reset"]
+    assert [e["amount"] for e in delta["changes"]["expense"]["upsert"]] == [10]
+
+def test_compaction_resets_only_stale_cursors(engine, session):
+    gid = _group(session)
+    stale = changes_since(session, gid, 0, "c1")["cursor"]
+    _expense(10)
+    current = changes_since(session, gid, stale, "c1")["cursor"]
+    changes_since(session, gid, current, "c1")  # acks everything, so the log is compacted
+    assert session.get(GroupSyncState, gid).compacted_through == current
+    assert changes_since(session, gid, stale - 1, "c2")["reset"]
+    assert not changes_since(session, gid, current, "c1")["reset"]
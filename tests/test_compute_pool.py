@@ -0,0 +1,117 @@
+# tests/test_compute_pool.py
+import time, threading
+from collections import OrderedDict
+import pytest
+from app.services import compute_pool as cp
+
+MEMBERS = [1, 2]
+LEDGER = [(1, 10.0, [(1, None), (2, None)])]
+FRESH = ({1: 5.0, 2: -5.0}, [{"from": 2, "to": 1, "amount": 5.0}])
+STALE = ({1: 1.0, 2: -1.0}, [{"from": 2, "to": 1, "amount": 1.0}])
+
+def slow_compute(member_ids, ledger):
+    # imported by name in the spawned worker, like cp._compute
+    time.sleep(1.0)
+    return cp.compute_nets(member_ids, ledger), cp.plan_settlements(cp.compute_nets(member_ids, ledger))
+
+@pytest.fixture(autouse=True)
+def pool(monkeypatch):
+    monkeypatch.setattr(cp, "POOL_WORKERS", 1)
+    monkeypatch.setattr(cp, "POOL_THRESHOLD", 1)
+    monkeypatch.setattr(cp, "POOL_TIMEOUT", 30.0)
+    monkeypatch.setattr(cp, "MAX_PENDING", 2)
+    monkeypatch.setattr(cp, "_pool", None)
+    monkeypatch.setattr(cp, "_last_results", OrderedDict())
+    monkeypatch.setattr(cp, "_inflight", {})
+    monkeypatch.setattr(cp, "_metrics", {k: 0 for k in cp._metrics})
+    monkeypatch.setattr(cp, "load_group_ledger", lambda session, group_id: (MEMBERS, LEDGER))
+    monkeypatch.setattr(cp, "add_names", lambda settlements, session: settlements)
+    yield
+    cp.shutdown_pool()
+
+def _balances(group_id=1):
+    return cp.group_balances_and_settlements(None, group_id)
+
+def _wait(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+def test_small_groups_stay_inline(monkeypatch):
+    monkeypatch.setattr(cp, "POOL_THRESHOLD", 100)
+    assert _balances() == FRESH
+    m = cp.pool_metrics()
+    assert m["inline"] == 1 and m["submitted"] == 0 and not m["running"]
+
+def test_first_view_goes_through_the_pool():
+    assert _balances() == FRESH
+    m = cp.pool_metrics()
+    assert m["submitted"] == 1 and m["inline"] == 0
+    _wait(lambda: cp.pool_metrics()["cached_groups"] == 1)
+
+def test_timeout_serves_the_stale_result(monkeypatch):
+    monkeypatch.setattr(cp, "_compute", slow_compute)
+    monkeypatch.setattr(cp, "POOL_TIMEOUT", 0.05)
+    cp._remember(1, STALE)
+    assert _balances() == STALE
+    m = cp.pool_metrics()
+    assert m["timeouts"] == 1 and m["stale_served"] == 1
+    # the late pool result replaces the cached one
+    _wait(lambda: cp.pool_metrics()["completed"] == 1)
+    assert cp._last_results[1] == FRESH
+
+def test_timeout_without_stale_computes_inline(monkeypatch):
+    monkeypatch.setattr(cp, "_compute", slow_compute)
+    monkeypatch.setattr(cp, "POOL_TIMEOUT", 0.05)
+    monkeypatch.setattr(cp, "_inline", lambda group_id, member_ids, ledger: FRESH)
+    assert _balances() == FRESH
+    assert cp.pool_metrics()["timeouts"] == 1
+
+def test_concurrent_requests_share_one_job(monkeypatch):
+    monkeypatch.setattr(cp, "_compute", slow_compute)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(_balances())) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [FRESH] * 3
+    m = cp.pool_metrics()
+    assert m["submitted"] == 1 and m["attached"] == 2
+
+def test_saturated_pool_serves_stale(monkeypatch):
+    monkeypatch.setattr(cp, "_compute", slow_compute)
+    monkeypatch.setattr(cp, "MAX_PENDING", 1)
+    assert cp._submit(1, MEMBERS, LEDGER) is not None
+    cp._remember(2, STALE)
+    assert _balances(2) == STALE
+    m = cp.pool_metrics()
+    assert m["saturated"] == 1 and m["submitted"] == 1 and m["stale_served"] == 1
+
+def _kill_workers():
+    pool = cp._pool
+    for proc in list(pool._processes.values()):
+        proc.kill()
+    return pool
+
+def test_recovers_after_idle_workers_die():
+    assert _balances() == FRESH
+    _wait(lambda: 1 in cp._last_results)
+    dead = _kill_workers()
+    _wait(lambda: dead._broken)
+    # the dead executor is dropped on submit and the cached result served instead of a 500
+    assert _balances() == FRESH
+    assert cp.pool_metrics()["stale_served"] == 1
+    assert cp._pool is None
+    assert _balances() == FRESH
+    assert cp._pool is not None and cp._pool is not dead
+    assert cp.pool_metrics()["submitted"] == 2
+
+def test_worker_dying_mid_job_resets_the_pool(monkeypatch):
+    monkeypatch.setattr(cp, "_compute", slow_compute)
+    future = cp._submit(1, MEMBERS, LEDGER)
+    _wait(lambda: future.running())
+    dead = _kill_workers()
+    _wait(lambda: cp._pool is not dead)
+    assert cp.pool_metrics()["errors"] == 1 and not cp._inflight
@@ -0,0 +1,107 @@
+# tests/test_email_outbox.py
+import socket, threading, socketserver
+import pytest
+from sqlmodel import Session, select
+from app.models import Group, EmailOutbox
+from app.services import email_outbox
+from app.services.membership_service import add_members_by_email
+
+class StandInSMTP(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: greets, accepts every command and stores each DATA payload."""
+
+    def handle(self):
+        reply = lambda line: self.wfile.write((line + "\r\n").encode())
+        reply("220 stand-in ready")
+        data, lines = False, []
+        for raw in self.rfile:
+            line = raw.decode().rstrip("\r\n")
+            if data:
+                if line == ".":
+                    self.server.received.append("\n".join(lines))
+                    data, lines = False, []
+                    reply("250 queued")
+                else:
+                    lines.append(line)
+                continue
+            cmd = line[:4].upper()
+            if cmd in ("EHLO", "HELO"):
+                reply("250-stand-in")
+                reply("250 STARTTLS")
+            elif cmd == "STAR":
+                # agrees to TLS, then answers the ClientHello with plain text
+                reply("220 go ahead")
+                reply("not a tls record")
+                return
+            elif cmd == "DATA":
+                data = True
+                reply("354 go ahead")
+            elif cmd == "QUIT":
+                reply("221 bye")
+                return
+            else:
+                reply("250 ok")
+
+@pytest.fixture
+def smtp_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), StandInSMTP)
+    server.received = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture(autouse=True)
+def fast_outbox(monkeypatch):
+    monkeypatch.setattr(email_outbox, "RATE_PER_SEC", 0)
+    monkeypatch.setattr(email_outbox, "SMTP_STARTTLS", False)
+    monkeypatch.setattr(email_outbox, "SMTP_USER", "")
+
+def _queue(engine, emails):
+    with Session(engine) as s:
+        g = Group(name="Trip")
+        s.add(g); s.flush()
+        add_members_by_email(s, g.id, emails, g.name)
+        s.commit()
+
+def _rows(engine):
+    with Session(engine) as s:
+        return s.exec(select(EmailOutbox).order_by(EmailOutbox.id)).all()
+
+def _closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def test_dispatch_sends_every_queued_invite(engine, smtp_server):
+    _queue(engine, ["a@example.com", "b@example.com"])
+    host, port = smtp_server.server_address
+    assert email_outbox.dispatch_once(engine, host, port) == 2
+    rows = _rows(engine)
+    assert [(r.status, r.attempts) for r in rows] == [("sent", 1), ("sent", 1)]
+    assert len(smtp_server.received) == 2
+    assert "Trip" in smtp_server.received[0]
+    assert email_outbox.dispatch_once(engine, host, port) == 0
+
+def test_connection_refused_schedules_a_retry(engine):
+    _queue(engine, ["a@example.com"])
+    assert email_outbox.dispatch_once(engine, "127.0.0.1", _closed_port()) == 1
+    row = _rows(engine)[0]
+    assert row.status == "pending" and row.attempts == 1
+    assert row.last_error.startswith("connect:")
+    assert row.next_attempt_at > row.created_at
+    # backing off: nothing is due yet
+    assert email_outbox.dispatch_once(engine, "127.0.0.1", _closed_port()) == 0
+
+def test_tls_failure_still_reports_every_message(smtp_server, monkeypatch):
+    # the handshake raises ssl.SSLError (an OSError), not an SMTPException
+    monkeypatch.setattr(email_outbox, "SMTP_STARTTLS", True)
+    host, port = smtp_server.server_address
+    results = email_outbox.send_batch([(1, "a@example.com", "s", "b"), (2, "b@example.com", "s", "b")], host, port)
+    assert set(results) == {1, 2}
+    assert all(e and e.startswith("auth:") for e in results.values())
+
+def test_gives_up_after_max_attempts(engine, monkeypatch):
+    monkeypatch.setattr(email_outbox, "MAX_ATTEMPTS", 1)
+    _queue(engine, ["a@example.com"])
+    email_outbox.dispatch_once(engine, "127.0.0.1", _closed_port())
+    assert _rows(engine)[0].status == "failed"
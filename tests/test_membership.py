@@ -0,0 +1,56 @@
+# tests/test_membership.py
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import SQLModel, select
+from app import db
+from app.models import User, Group, GroupMember, Invite, GroupChange
+from app.services.membership_service import add_members, redeem_invites
+
+def _memberships(session):
+    return sorted(tuple(r) for r in session.exec(select(GroupMember.group_id, GroupMember.user_id)).all())
+
+def test_schema_sync_removes_duplicates_and_builds_unique_index(engine, session):
+    # an old database: same tables, no unique index, and duplicate memberships
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_groupmember_group_user"))
+        conn.execute(text("PRAGMA user_version = 0"))
+    session.add_all([User(name="a"), User(name="b"), Group(name="g")])
+    session.commit()
+    session.add_all([GroupMember(group_id=1, user_id=1), GroupMember(group_id=1, user_id=1), GroupMember(group_id=1, user_id=2), GroupMember(group_id=1, user_id=1)])
+    session.commit()
+
+    assert db.ensure_schema(engine, SQLModel.metadata, migrate=db._migrate)
+    assert session.exec(select(GroupMember.id).order_by(GroupMember.id)).all() == [1, 3]
+    with pytest.raises(IntegrityError):
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO groupmember (group_id, user_id) VALUES (1, 1)"))
+    # fingerprint stored, so the next start skips the sync
+    assert not db.ensure_schema(engine, SQLModel.metadata, migrate=db._migrate)
+
+def test_redeem_turns_duplicate_invites_into_one_membership(engine, session):
+    session.add_all([User(name="a", email="a@example.com"), Group(name="g1"), Group(name="g2")])
+    session.commit()
+    session.add_all([Invite(group_id=1, email="a@example.com"), Invite(group_id=1, email="a@example.com"), Invite(group_id=2, email="a@example.com"),
+                     Invite(group_id=2, email="other@example.com")])
+    session.commit()
+
+    redeem_invites(session, 1, "a@example.com")
+    session.commit()
+    assert _memberships(session) == [(1, 1), (2, 1)]
+    assert session.exec(select(Invite.email)).all() == ["other@example.com"]
+    assert len(session.exec(select(GroupChange).where(GroupChange.entity == "member")).all()) == 2
+
+def test_existing_members_are_not_added_twice(engine, session):
+    session.add_all([User(name="a", email="a@example.com"), Group(name="g")])
+    session.commit()
+    add_members(session, 1, [1])
+    session.add(Invite(group_id=1, email="a@example.com"))
+    session.commit()
+
+    add_members(session, 1, [1, 1])
+    redeem_invites(session, 1, "a@example.com")
+    session.commit()
+    assert _memberships(session) == [(1, 1)]
+    assert session.exec(select(Invite)).all() == []
+    assert len(session.exec(select(GroupChange)).all()) == 1
@@ -0,0 +1,70 @@
+# tests/test_rollups.py
+from datetime import date, datetime
+from sqlmodel import select
+from app.models import User, Expense, SpendRollup
+from app.routes import group as group_routes, expense as expense_routes
+from app.services import rollup_service
+
+USER = {"id": 1}
+
+def _rollups(session):
+    rows = session.exec(select(SpendRollup.user_id, SpendRollup.period, SpendRollup.bucket, SpendRollup.paid, SpendRollup.owed, SpendRollup.expenses)).all()
+    return sorted(tuple(r) for r in rows)
+
+def _setup(session):
+    session.add_all([User(name="a"), User(name="b")])
+    session.commit()
+    group_routes.create_group(name="g", current_user=USER)
+    group_routes.add_member(1, name="c", email=None, current_user=USER)
+
+def _add(amount, payer_id=1, participants=(1, 3), shares=None):
+    expense_routes.add_expense(1, payer_id=payer_id, amount=amount, description="x", participants=list(participants), shares=shares, current_user=USER)
+
+def test_add_then_delete_leaves_rollups_unchanged(engine, session):
+    _setup(session)
+    _add(10)
+    before = _rollups(session)
+    _add(7, payer_id=3, shares=["1", "3"])
+    _add(100, participants=(1,))
+    expense_routes.delete_expense(1, 3, current_user=USER)
+    expense_routes.delete_expense(1, 2, current_user=USER)
+    session.expire_all()
+    assert _rollups(session) == before
+
+def test_incremental_rollups_match_backfill(engine, session):
+    _setup(session)
+    _add(10)
+    _add(7, payer_id=3, shares=["1", "3"])
+    _add(3.33, participants=(1, 3))
+    expense_routes.delete_expense(1, 1, current_user=USER)
+    session.expire_all()
+    live = _rollups(session)
+    rollup_service.backfill(session)
+    assert _rollups(session) == live
+
+def test_analytics_totals(engine, session):
+    _setup(session)
+    _add(10)
+    _add(7, payer_id=3, shares=["1", "3"])
+    a = rollup_service.group_analytics(session, 1, "month")
+    assert len(a["series"]) == 1
+    assert a["series"][0]["paid"] == 17 and a["series"][0]["expenses"] == 2
+    assert [p["user_id"] for p in a["top_payers"]] == [1, 3]
+    assert round(sum(m["pct"] for m in a["member_share"])) == 100
+
+def test_deleting_every_expense_empties_analytics(engine, session):
+    _setup(session)
+    _add(10)
+    _add(7, payer_id=3, shares=["1", "3"])
+    expense_routes.delete_expense(1, 1, current_user=USER)
+    expense_routes.delete_expense(1, 2, current_user=USER)
+    session.expire_all()
+    assert _rollups(session) == []
+    a = rollup_service.group_analytics(session, 1, "month")
+    assert a["series"] == [] and a["top_payers"] == [] and a["member_share"] == []
+
+def test_month_start_counts_calendar_months():
+    assert rollup_service.month_start(date(2026, 7, 31), 11) == date(2025, 8, 1)
+    assert rollup_service.month_start(date(2026, 12, 1), 11) == date(2026, 1, 1)
+    assert rollup_service.month_start(date(2026, 1, 15), 11) == date(2025, 2, 1)
+    assert rollup_service.month_start(date(2026, 3, 31), 0) == date(2026, 3, 1)